@@ -55,10 +55,9 @@ def main() -> int:
             print("No race candidates found.")
             return 0
 
-        # Affichage des avertissements
+        # Affichage des avertissements (un seul write, séparés par une ligne vide)
         print(f"{len(warnings)} race candidate(s) found:\n")
-        for w in warnings:
-            print(format_warning(w))
+        sys.stdout.write("\n".join(map(format_warning, warnings)) + "\n")
 
         # Code de sortie 2 : races détectées
         return 2
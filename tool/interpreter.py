@@ -3,6 +3,7 @@ from __future__ import annotations
 
 from dataclasses import dataclass
 from typing import Dict, List, Optional, TextIO, Tuple, Union
+import re
 import sys
 
 
@@ -20,9 +21,12 @@ class InterpreterError(Exception):
 
 TokenType = str
 
+_BOOL_STR = ("False", "True")
+
 
 @dataclass
 class Token:
+    __slots__ = ("type", "value", "position")
     type: TokenType
     value: Optional[str]
     position: int
@@ -67,6 +71,24 @@ DOUBLE_CHAR_TOKENS = {
     "<=": "LESS_EQUAL",
 }
 
+# ASCII lookup tables indexed by ord(ch). The second table is keyed on the first
+# character only, so every double-char operator must end with "=" (checked below).
+_SINGLE_CHAR_TABLE: List[Optional[TokenType]] = [None] * 128
+for _ch, _tt in SINGLE_CHAR_TOKENS.items():
+    _SINGLE_CHAR_TABLE[ord(_ch)] = _tt
+
+_DOUBLE_CHAR_TABLE: List[Optional[TokenType]] = [None] * 128
+for _op, _tt in DOUBLE_CHAR_TOKENS.items():
+    if len(_op) != 2 or _op[1] != "=":
+        raise ValueError(f"Double-char operator {_op!r} must end with '=' to use the lookup table")
+    _DOUBLE_CHAR_TABLE[ord(_op[0])] = _tt
+del _ch, _op, _tt
+
+# Whitespace runs and line-comment ends are located with compiled patterns so the
+# scan runs in the regex engine instead of one Python iteration per character.
+_BLANK_RE = re.compile(r"[ \t\r\n]+")
+_LINE_END_RE = re.compile(r"[\r\n]")
+
 
 class Lexer:
     def __init__(self, source: str) -> None:
@@ -111,34 +133,33 @@ class Lexer:
             value = self.source[start:self.position]
             return Token("NUMBER", value, start)
 
-        # Double char operators
-        if self.position + 1 < self.length:
-            maybe = self.source[self.position : self.position + 2]
-            if maybe in DOUBLE_CHAR_TOKENS:
-                self.position += 2
-                return Token(DOUBLE_CHAR_TOKENS[maybe], maybe, self.position - 2)
-
-        # Single char tokens
-        if ch in SINGLE_CHAR_TOKENS:
-            self.position += 1
-            return Token(SINGLE_CHAR_TOKENS[ch], ch, self.position - 1)
+        code = ord(ch)
+        if code < 128:
+            # Double char operators
+            if self.position + 1 < self.length and self.source[self.position + 1] == "=":
+                token_type = _DOUBLE_CHAR_TABLE[code]
+                if token_type is not None:
+                    self.position += 2
+                    return Token(token_type, ch + "=", self.position - 2)
+
+            # Single char tokens
+            token_type = _SINGLE_CHAR_TABLE[code]
+            if token_type is not None:
+                self.position += 1
+                return Token(token_type, ch, self.position - 1)
 
         raise LexerError(f"Unexpected character {ch!r} at position {self.position}")
 
     def _skip_ignored(self) -> None:
         while self.position < self.length:
-            ch = self.source[self.position]
-            if ch in " \t\r\n":
-                self.position += 1
+            blank = _BLANK_RE.match(self.source, self.position)
+            if blank is not None:
+                self.position = blank.end()
                 continue
 
             if self.source.startswith("//", self.position):
-                self.position += 2
-                while (
-                    self.position < self.length
-                    and self.source[self.position] not in "\r\n"
-                ):
-                    self.position += 1
+                line_end = _LINE_END_RE.search(self.source, self.position + 2)
+                self.position = line_end.start() if line_end is not None else self.length
                 continue
 
             if self.source.startswith("/*", self.position):
@@ -155,29 +176,39 @@ class Lexer:
 
 
 class Statement:
-    pass
+    __slots__ = ()
 
 
 @dataclass
 class Declare(Statement):
+    __slots__ = ("name", "typ")
     name: str
     typ: str  # "int" or "bool"
 
 
 @dataclass
 class Assignment(Statement):
+    # has_scope (True if scope is non-empty) is set in __post_init__: a plain slot, not a field
+    __slots__ = ("name", "scope", "expression", "has_scope")
     name: str
     scope: Optional["Scope"]
     expression: "Expression"
 
+    def __post_init__(self) -> None:
+        self.has_scope = self.scope is not None and bool(
+            self.scope.declarations or self.scope.statements
+        )
+
 
 @dataclass
 class Print(Statement):
+    __slots__ = ("expression",)
     expression: "Expression"
 
 
 @dataclass
 class IfElse(Statement):
+    __slots__ = ("condition", "if_statements", "else_statements")
     condition: "Expression"
     if_statements: List[Statement]
     else_statements: List[Statement]
@@ -185,38 +216,44 @@ class IfElse(Statement):
 
 @dataclass
 class While(Statement):
+    __slots__ = ("condition", "statements")
     condition: "Expression"
     statements: List[Statement]
 
 
 @dataclass
 class Scope:
+    __slots__ = ("declarations", "statements")
     declarations: List[Declare]
     statements: List[Statement]
 
 
 class Expression:
-    pass
+    __slots__ = ()
 
 
 @dataclass
 class Literal(Expression):
+    __slots__ = ("value",)
     value: Union[int, bool]
 
 
 @dataclass
 class Identifier(Expression):
+    __slots__ = ("name",)
     name: str
 
 
 @dataclass
 class UnaryOp(Expression):
+    __slots__ = ("operator", "operand")
     operator: str
     operand: Expression
 
 
 @dataclass
 class BinaryOp(Expression):
+    __slots__ = ("operator", "left", "right")
     operator: str
     left: Expression
     right: Expression
@@ -482,11 +519,10 @@ class Environment:
 
     def print(self, value: Union[int, bool]) -> None:
         if isinstance(value, bool):
-            text = "True" if value else "False"
+            text = _BOOL_STR[value]
         else:
             text = str(value)
         self.stdout.write(text + "\n")
-        self.stdout.flush()
 
 
 class Interpreter:
@@ -495,7 +531,10 @@ class Interpreter:
         self.environment = Environment(stdout=stdout)
 
     def run(self) -> None:
-        self._execute_scope(self.scope, self.environment)
+        try:
+            self._execute_scope(self.scope, self.environment)
+        finally:
+            self.environment.stdout.flush()
 
     def _execute_scope(self, scope: Scope, environment: Environment) -> None:
         for declaration in scope.declarations:
@@ -531,19 +570,13 @@ class Interpreter:
             raise InterpreterError(f"Unsupported statement: {statement}")
 
     def _execute_assignment(self, statement: Assignment, environment: Environment) -> None:
-        target_env = environment
-        if statement.scope is not None and (
-            statement.scope.declarations or statement.scope.statements
-        ):
-            target_env = environment
+        if statement.has_scope:
             scope_env = environment.create_child()
             self._execute_scope(statement.scope, scope_env)
             value = self._evaluate_expression(statement.expression, scope_env)
         else:
-            scope_env = environment
-            value = self._evaluate_expression(statement.expression, scope_env)
-
-        target_env.set(statement.name, value)
+            value = self._evaluate_expression(statement.expression, environment)
+        environment.set(statement.name, value)
 
     def _evaluate_expression(self, expression: Expression, environment: Environment) -> Union[int, bool]:
         if isinstance(expression, Literal):
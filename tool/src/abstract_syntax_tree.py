@@ -8,22 +8,27 @@ from typing import List, Optional, Dict, Union
 # -----------------------
 @dataclass
 class Expr:
+    __slots__ = ("line",)
     line: int
 
 @dataclass
 class Var(Expr):
+    __slots__ = ("name",)
     name: str
 
 @dataclass
 class Num(Expr):
+    __slots__ = ("value",)
     value: int
 
 @dataclass
 class Bool(Expr):
+    __slots__ = ("value",)
     value: bool
 
 @dataclass
 class BinOp(Expr):
+    __slots__ = ("op", "left", "right")
     op: str
     left: Expr
     right: Expr
@@ -31,6 +36,7 @@ class BinOp(Expr):
 # Opérateur relationnel (==, !=, <, <=, >, >=)
 @dataclass
 class RelOp(Expr):
+    __slots__ = ("op", "left", "right")
     op: str
     left: Expr
     right: Expr
@@ -40,21 +46,25 @@ class RelOp(Expr):
 # -----------------------
 @dataclass
 class Stmt:
+    __slots__ = ("line",)
     line: int
 
 @dataclass
 class Assign(Stmt):
+    __slots__ = ("target", "expr")
     target: str
     expr: Expr
 
 @dataclass
 class AssignCall(Stmt):
+    __slots__ = ("target", "func", "args")
     target: str
     func: str
     args: List[Expr]
 
 @dataclass
 class CallStmt(Stmt):
+    __slots__ = ("func", "args")
     func: str
     args: List[Expr]
 
@@ -63,22 +73,26 @@ class CallStmt(Stmt):
 # -----------------------
 @dataclass
 class SpawnCall:
+    __slots__ = ("func", "args", "line")
     func: str
     args: List[Expr]
     line: int
 
 @dataclass
 class SpawnBlock:
+    __slots__ = ("body", "line")
     body: "Seq"  # Bloc d'instructions à exécuter dans le spawn
     line: int
 
 @dataclass
 class Spawn(Stmt):
+    __slots__ = ("handle", "target")
     handle: Optional[str]
     target: Union[SpawnCall, SpawnBlock]
 
 @dataclass
 class Await(Stmt):
+    __slots__ = ("handle",)
     handle: str
 
 # -----------------------
@@ -86,21 +100,25 @@ class Await(Stmt):
 # -----------------------
 @dataclass
 class If(Stmt):
+    __slots__ = ("cond", "then_s", "else_s")
     cond: Expr
     then_s: Stmt
     else_s: Stmt
 
 @dataclass
 class While(Stmt):
+    __slots__ = ("cond", "body")
     cond: Expr
     body: Stmt
 
 @dataclass
 class Seq(Stmt):
+    __slots__ = ("stmts",)
     stmts: List[Stmt]
 
 @dataclass
 class Return(Stmt):
+    __slots__ = ("expr",)
     expr: Expr
 
 # -----------------------
@@ -108,6 +126,7 @@ class Return(Stmt):
 # -----------------------
 @dataclass
 class FunctionDef:
+    __slots__ = ("name", "params", "body", "line")
     name: str
     params: List[str]
     body: Seq
@@ -115,4 +134,5 @@ class FunctionDef:
 
 @dataclass
 class Program:
+    __slots__ = ("functions",)
     functions: Dict[str, FunctionDef]  # Dictionnaire des fonctions du programme, indexées par leur nom
@@ -1,15 +1,18 @@
 from __future__ import annotations
 from dataclasses import dataclass, field
-from typing import Dict, Set
+from typing import AbstractSet, Dict, FrozenSet, Mapping, Set
 
 from src.effects import Effect
 
 
-@dataclass
+@dataclass(frozen=True)
 class ThreadInfo:
     """
     Informations sur un thread actif pour la détection de data races.
 
+    Les ensembles sont immuables : un ThreadInfo peut donc être partagé
+    entre plusieurs états concurrents sans copie.
+
     :param thread_id: identifiant unique du thread
     :param desc: description du thread (ex: fonction spawnée)
     :param spawn_line: ligne où le thread a été créé
@@ -21,10 +24,10 @@ class ThreadInfo:
     thread_id: str
     desc: str
     spawn_line: int
-    reads: Set[str]
-    writes: Set[str]
-    read_sites: Dict[str, Set[int]]
-    write_sites: Dict[str, Set[int]]
+    reads: FrozenSet[str]
+    writes: FrozenSet[str]
+    read_sites: Mapping[str, FrozenSet[int]]
+    write_sites: Mapping[str, FrozenSet[int]]
 
 
 def threadinfo_from_effect(eff: Effect, tid: str, desc: str, spawn_line: int) -> ThreadInfo:
@@ -41,40 +44,170 @@ def threadinfo_from_effect(eff: Effect, tid: str, desc: str, spawn_line: int) ->
         thread_id=tid,
         desc=desc,
         spawn_line=spawn_line,
-        reads=set(eff.reads),
-        writes=set(eff.writes),
-        read_sites={k: set(v) for k, v in eff.read_sites.items()},
-        write_sites={k: set(v) for k, v in eff.write_sites.items()},
+        reads=frozenset(eff.reads),
+        writes=frozenset(eff.writes),
+        read_sites={k: frozenset(v) for k, v in eff.read_sites.items()},
+        write_sites={k: frozenset(v) for k, v in eff.write_sites.items()},
     )
 
 
+def _merge_sites(
+    a: Mapping[str, FrozenSet[int]], b: Mapping[str, FrozenSet[int]]
+) -> Dict[str, FrozenSet[int]]:
+    """
+    Fusionne deux mappings variable -> lignes sans modifier les entrées.
+
+    :param a: premier mapping
+    :param b: deuxième mapping
+    :return: nouveau mapping contenant l'union des lignes par variable
+    """
+    empty: FrozenSet[int] = frozenset()
+    return {k: a.get(k, empty) | b.get(k, empty) for k in a.keys() | b.keys()}
+
+
+def _index_add(index: Dict[str, FrozenSet[str]], variables: AbstractSet[str], tid: str) -> None:
+    """
+    Ajoute tid à la liste des threads de chaque variable de l'index (copie à l'écriture).
+
+    :param index: index variable -> tids
+    :param variables: variables accédées par le thread
+    :param tid: identifiant du thread
+    """
+    empty: FrozenSet[str] = frozenset()
+    for v in variables:
+        index[v] = index.get(v, empty) | {tid}
+
+
+def _index_remove(index: Dict[str, FrozenSet[str]], variables: AbstractSet[str], tid: str) -> None:
+    """
+    Retire tid de la liste des threads de chaque variable de l'index (copie à l'écriture).
+
+    :param index: index variable -> tids
+    :param variables: variables accédées par le thread
+    :param tid: identifiant du thread
+    """
+    for v in variables:
+        tids = index.get(v)
+        if tids is not None and tid in tids:
+            index[v] = tids - {tid}
+
+
+def _merge_index(a: Dict[str, FrozenSet[str]], b: Dict[str, FrozenSet[str]]) -> Dict[str, FrozenSet[str]]:
+    """
+    Fusionne deux mappings clé -> ensemble de tids, en conservant les entrées partagées.
+
+    :param a: premier mapping
+    :param b: deuxième mapping
+    :return: nouveau mapping contenant l'union des tids par clé
+    """
+    out = a.copy()
+    for k, tids in b.items():
+        o = out.get(k)
+        if o is None:
+            out[k] = tids
+        elif o is not tids:
+            out[k] = o | tids
+    return out
+
+
 @dataclass
 class ConcurState:
     """
     État concurrent du programme pour la détection de races.
 
+    Les ThreadInfo et les ensembles de tids sont immuables : les mises à jour
+    remplacent l'entrée du dictionnaire au lieu de la modifier, ce qui permet
+    de partager ces valeurs entre copies.
+
+    Les index readers/writers peuvent contenir des tids qui ne sont plus actifs
+    (sur-approximation) ; ils doivent toujours être filtrés par `active`.
+
     :param active: dictionnaire tid -> ThreadInfo des threads actifs
     :param handle_env: mapping handle -> ensemble de tids associés
+    :param readers: index variable -> tids des threads actifs qui la lisent
+    :param writers: index variable -> tids des threads actifs qui l'écrivent
     """
     active: Dict[str, ThreadInfo] = field(default_factory=dict)
-    handle_env: Dict[str, Set[str]] = field(default_factory=dict)
+    handle_env: Dict[str, FrozenSet[str]] = field(default_factory=dict)
+    readers: Dict[str, FrozenSet[str]] = field(default_factory=dict)
+    writers: Dict[str, FrozenSet[str]] = field(default_factory=dict)
 
     def copy(self) -> "ConcurState":
         """
         Retourne une copie indépendante de l'état concurrent.
 
+        Seuls les dictionnaires sont copiés ; leurs valeurs immuables sont partagées.
+
         :return: nouvelle instance de ConcurState identique
         """
         return ConcurState(
-            active=dict(self.active),
-            handle_env={k: set(v) for k, v in self.handle_env.items()},
+            active=self.active.copy(),
+            handle_env=self.handle_env.copy(),
+            readers=self.readers.copy(),
+            writers=self.writers.copy(),
         )
 
+    def add_thread(self, t: ThreadInfo) -> None:
+        """
+        Active un thread (en remplaçant un éventuel thread de même tid) et l'indexe.
+
+        :param t: thread à activer
+        """
+        self.active[t.thread_id] = t
+        _index_add(self.readers, t.reads, t.thread_id)
+        _index_add(self.writers, t.writes, t.thread_id)
+
+    def remove_thread(self, tid: str) -> None:
+        """
+        Désactive un thread et le retire des index.
+
+        :param tid: identifiant du thread
+        """
+        t = self.active.pop(tid, None)
+        if t is not None:
+            _index_remove(self.readers, t.reads, tid)
+            _index_remove(self.writers, t.writes, tid)
+
+    def threads_accessing(self, var: str, mode: str) -> FrozenSet[str]:
+        """
+        Tids des threads actifs pouvant entrer en conflit avec un accès à `var`
+        dans le mode donné : les écrivains pour une lecture, les lecteurs et
+        écrivains pour une écriture.
+
+        :param var: variable accédée
+        :param mode: mode d'accès ("R", "W", "RW")
+        :return: ensemble de tids candidats (à filtrer par `active`)
+        """
+        empty: FrozenSet[str] = frozenset()
+        if mode == "R":
+            return self.writers.get(var, empty)
+        return self.readers.get(var, empty) | self.writers.get(var, empty)
+
+    def threads_overlapping(self, t: ThreadInfo) -> Set[str]:
+        """
+        Tids des threads actifs pouvant entrer en conflit avec `t`, c'est-à-dire
+        partageant au moins une variable dont l'un des deux accès est une écriture.
+
+        :param t: thread à comparer
+        :return: ensemble de tids candidats (à filtrer par `active`)
+        """
+        empty: FrozenSet[str] = frozenset()
+        tids: Set[str] = set()
+        for v in t.writes:
+            tids |= self.readers.get(v, empty)
+            tids |= self.writers.get(v, empty)
+        for v in t.reads:
+            tids |= self.writers.get(v, empty)
+        return tids
+
 
 def join_states(a: ConcurState, b: ConcurState) -> ConcurState:
     """
     Fusionne deux états concurrents, en combinant les informations des threads et des handles.
 
+    Les entrées identiques (même objet) dans les deux états sont conservées telles quelles ;
+    seules les entrées réellement divergentes sont recalculées.
+
     :param a: premier état concurrent
     :param b: deuxième état concurrent
     :return: nouvel état combiné
@@ -82,36 +215,29 @@ def join_states(a: ConcurState, b: ConcurState) -> ConcurState:
     out = ConcurState()
     
     # Copier les threads du premier état
-    out.active = dict(a.active)
+    out.active = a.active.copy()
 
     # Fusionner les threads du deuxième état
     for tid, t in b.active.items():
-        if tid in out.active:
+        o = out.active.get(tid)
+        if o is None:
+            # Thread nouveau : on l'ajoute tel quel
+            out.active[tid] = t
+        elif o is not t:
             # Thread déjà présent : fusionner lectures, écritures et sites
-            o = out.active[tid]
-            merged = ThreadInfo(
+            out.active[tid] = ThreadInfo(
                 thread_id=tid,
                 desc=o.desc,
                 spawn_line=o.spawn_line,
-                reads=set(o.reads) | set(t.reads),
-                writes=set(o.writes) | set(t.writes),
-                read_sites={k: set(v) for k, v in o.read_sites.items()},
-                write_sites={k: set(v) for k, v in o.write_sites.items()},
+                reads=o.reads | t.reads,
+                writes=o.writes | t.writes,
+                read_sites=_merge_sites(o.read_sites, t.read_sites),
+                write_sites=_merge_sites(o.write_sites, t.write_sites),
             )
-            # Fusionner les lignes de lecture
-            for k, vs in t.read_sites.items():
-                merged.read_sites.setdefault(k, set()).update(vs)
-            # Fusionner les lignes d'écriture
-            for k, vs in t.write_sites.items():
-                merged.write_sites.setdefault(k, set()).update(vs)
-            out.active[tid] = merged
-        else:
-            # Thread nouveau : on l'ajoute tel quel
-            out.active[tid] = t
 
-    # Fusionner handle_env
-    out.handle_env = {k: set(v) for k, v in a.handle_env.items()}
-    for k, vs in b.handle_env.items():
-        out.handle_env.setdefault(k, set()).update(vs)
+    # Fusionner handle_env et les index de variables
+    out.handle_env = _merge_index(a.handle_env, b.handle_env)
+    out.readers = _merge_index(a.readers, b.readers)
+    out.writers = _merge_index(a.writers, b.writers)
 
     return out
@@ -1,6 +1,7 @@
 from __future__ import annotations
 from dataclasses import dataclass
-from typing import List, Optional, Set, Tuple
+from heapq import merge
+from typing import Any, List, Optional, Set, Tuple, Union
 
 from src.concurrency import ConcurState, ThreadInfo
 
@@ -25,6 +26,11 @@ class RaceWarning:
     ctx_b: str
 
 
+
+# Mode d'accès indexé par (lecture | écriture << 1)
+_MODE_TABLE: Tuple[Optional[str], ...] = (None, "R", "W", "RW")
+
+
 def mode_for(var: str, reads: Set[str], writes: Set[str]) -> Optional[str]:
     """
     Détermine le mode d'accès d'une variable dans un thread.
@@ -34,34 +40,41 @@ def mode_for(var: str, reads: Set[str], writes: Set[str]) -> Optional[str]:
     :param writes: ensemble des variables écrites
     :return: "R", "W", "RW" ou None si non utilisée
     """
-    r = var in reads
-    w = var in writes
-    if r and w:
-        return "RW"
-    if r:
-        return "R"
-    if w:
-        return "W"
-    return None
+    return _MODE_TABLE[(var in reads) | ((var in writes) << 1)]
 
 
-def collect_other_lines(t: ThreadInfo, var: str) -> Set[int]:
+def collect_other_lines(t: ThreadInfo, var: str) -> Tuple[int, ...]:
     """
     Récupère toutes les lignes où la variable a été accédée dans un thread donné.
     
     :param t: informations sur le thread
     :param var: variable à analyser
-    :return: ensemble des lignes concernées
+    :return: tuple trié (sans doublons) des lignes concernées
     """
     lines: Set[int] = set()
     if var in t.writes:
-        lines |= set(t.write_sites.get(var, set()))
+        lines |= t.write_sites.get(var, set())
     if var in t.reads:
-        lines |= set(t.read_sites.get(var, set()))
+        lines |= t.read_sites.get(var, set())
     # si aucune ligne spécifique, on ajoute la ligne de spawn du thread
     if not lines:
-        lines.add(t.spawn_line)
-    return lines
+        return (t.spawn_line,)
+    return tuple(sorted(lines))
+
+
+def merge_lines(a: Tuple[int, ...], b: Tuple[int, ...]) -> Tuple[int, ...]:
+    """
+    Fusionne deux tuples de lignes déjà triés en un tuple trié sans doublons.
+
+    :param a: premier tuple trié
+    :param b: deuxième tuple trié
+    :return: tuple trié contenant les lignes des deux entrées
+    """
+    out: List[int] = []
+    for ln in merge(a, b):
+        if not out or out[-1] != ln:
+            out.append(ln)
+    return tuple(out)
 
 
 def conflicts(mode: str, t: ThreadInfo, var: str) -> bool:
@@ -80,27 +93,52 @@ def conflicts(mode: str, t: ThreadInfo, var: str) -> bool:
     return False
 
 
-def check_access(state: ConcurState, var: str, mode: str, line: int, ctx: str) -> List[RaceWarning]:
+# Contexte d'un accès : soit une chaîne déjà formatée, soit un tuple (gabarit, arguments...)
+# qui n'est formaté que si un conflit est effectivement signalé
+AccessContext = Union[str, Tuple[Any, ...]]
+
+
+def format_context(ctx: AccessContext) -> str:
+    """
+    Formate un contexte d'accès.
+
+    :param ctx: chaîne ou tuple (gabarit str.format, arguments...)
+    :return: chaîne de contexte
     """
-    Vérifie les accès concurrents entre le thread courant et tous les threads actifs.
+    if isinstance(ctx, str):
+        return ctx
+    return ctx[0].format(*ctx[1:])
+
+
+def check_access(state: ConcurState, var: str, mode: str, line: int, ctx: AccessContext) -> List[RaceWarning]:
+    """
+    Vérifie les accès concurrents entre le thread courant et les threads actifs
+    qui accèdent à la même variable.
     
     :param state: état courant des threads
     :param var: variable accédée
     :param mode: mode d'accès du thread courant
     :param line: ligne de l'accès
-    :param ctx: contexte du thread courant
+    :param ctx: contexte du thread courant (formaté seulement en cas de conflit)
     :return: liste de RaceWarning détectées
     """
     out: List[RaceWarning] = []
-    for t in state.active.values():
-        if conflicts(mode, t, var):
+    ctx_a: Optional[str] = None
+    # Seuls les threads indexés sur cette variable sont candidats (l'index peut être
+    # sur-approximé : on revérifie l'activité et le conflit)
+    active = state.active
+    for tid in state.threads_accessing(var, mode):
+        t = active.get(tid)
+        if t is not None and conflicts(mode, t, var):
+            if ctx_a is None:
+                ctx_a = format_context(ctx)
             out.append(RaceWarning(
-                var=var,
-                kind=f"{mode} vs T",
-                line_a=line,
-                ctx_a=ctx,
-                lines_b=tuple(sorted(collect_other_lines(t, var))),
-                ctx_b=f"{t.desc} (spawn line {t.spawn_line})",
+                var,
+                f"{mode} vs T",
+                line,
+                ctx_a,
+                collect_other_lines(t, var),
+                f"{t.desc} (spawn line {t.spawn_line})",
             ))
     return out
 
@@ -118,13 +156,19 @@ def check_thread_thread(newt: ThreadInfo, oldt: ThreadInfo, discover_line: int)
     overlap = (newt.writes & (oldt.reads | oldt.writes)) | (newt.reads & oldt.writes)
     
     out: List[RaceWarning] = []
+    if not overlap:
+        return out
+
+    # Les contextes ne dépendent que de la paire de threads : calculés une seule fois
+    ctx_a = f"concurrent threads overlap starting at spawn line {discover_line}"
+    ctx_b = f"{oldt.desc} (spawn {oldt.spawn_line}) || {newt.desc} (spawn {newt.spawn_line})"
     for var in sorted(overlap):
         out.append(RaceWarning(
-            var=var,
-            kind="T vs T",
-            line_a=discover_line,
-            ctx_a=f"concurrent threads overlap starting at spawn line {discover_line}",
-            lines_b=tuple(sorted(collect_other_lines(oldt, var) | collect_other_lines(newt, var))),
-            ctx_b=f"{oldt.desc} (spawn {oldt.spawn_line}) || {newt.desc} (spawn {newt.spawn_line})",
+            var,
+            "T vs T",
+            discover_line,
+            ctx_a,
+            merge_lines(collect_other_lines(oldt, var), collect_other_lines(newt, var)),
+            ctx_b,
         ))
     return out
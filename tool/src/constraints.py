@@ -3,24 +3,37 @@ from __future__ import annotations
 from src.abstract_syntax_tree import *
 
 
-def enforce_no_spawn_await_in_if_while(stmt: Stmt, inside_control: bool = False) -> None:
+def enforce_no_spawn_await_in_if_while(
+    stmt: Stmt, inside_control: bool = False, spawns: list[Spawn] | None = None, awaits: list[Await] | None = None
+) -> None:
     """
     Vérifie récursivement qu'aucun 'spawn' ou 'await' n'apparaît
     à l'intérieur d'un 'if' ou d'un 'while'.
 
+    Les spawn/await rencontrés sont ajoutés aux listes fournies, dans l'ordre du
+    programme (même résultat que list_spawns_awaits, sans second parcours).
+
     :param stmt: statement à analyser
     :param inside_control: True si l'on est actuellement dans un if ou un while
+    :param spawns: liste accumulant les objets Spawn trouvés (optionnelle)
+    :param awaits: liste accumulant les objets Await trouvés (optionnelle)
     """
 
     # Si on rencontre un spawn ou un await alors qu'on est déjà
     # à l'intérieur d'un if ou d'un while
-    if isinstance(stmt, (Spawn, Await)) and inside_control:
-        raise ValueError(f"spawn/await not allowed inside if/while (line {stmt.line})")
+    if isinstance(stmt, (Spawn, Await)):
+        if inside_control:
+            raise ValueError(f"spawn/await not allowed inside if/while (line {stmt.line})")
+        if isinstance(stmt, Spawn):
+            if spawns is not None:
+                spawns.append(stmt)
+        elif awaits is not None:
+            awaits.append(stmt)
 
     # Analyse récursives pour les séquences ({ ... })
-    if isinstance(stmt, Seq):
+    elif isinstance(stmt, Seq):
         for s in stmt.stmts:
-            enforce_no_spawn_await_in_if_while(s, inside_control)
+            enforce_no_spawn_await_in_if_while(s, inside_control, spawns, awaits)
 
     # Analyse des deux branches pour les if
     elif isinstance(stmt, If):
@@ -1,54 +1,99 @@
 from __future__ import annotations
-from dataclasses import dataclass, field
+from collections import deque
+from dataclasses import dataclass
+from typing import TYPE_CHECKING, Optional
 
 from src.abstract_syntax_tree import *
 
+if TYPE_CHECKING:
+    from src.concurrency import ThreadInfo
+
 
 # -----------------------------------------------------------------------------
 # Variable extraction
 # -----------------------------------------------------------------------------
 
 
-def vars_in_expr(e: Expr) -> set[str]:
+# Mémo des variables par expression, indexé par id(expr). L'expression est conservée
+# à côté du résultat pour que son id ne puisse pas être réutilisé tant que l'entrée existe.
+_VARS_MEMO: dict[int, tuple[Expr, frozenset[str]]] = {}
+
+_NO_VARS: frozenset[str] = frozenset()
+
+
+def clear_vars_memo() -> None:
+    """Vide le mémo de vars_in_expr (fait une seule fois, à la fin de analyze_program)."""
+    _VARS_MEMO.clear()
+
+
+def vars_in_expr(e: Expr) -> frozenset[str]:
     """
     Retourne l'ensemble des noms de variables utilisés dans une expression.
 
+    Les noeuds de l'AST ne sont pas modifiés après le parsing : le résultat est
+    mémorisé par expression et partagé entre tous les appels.
+
     :param e: expression à analyser (Var, Num, Bool, BinOp, RelOp)
-    :return: set de noms de variables (strings)
+    :return: frozenset de noms de variables (strings)
     """
+    hit = _VARS_MEMO.get(id(e))
+    if hit is not None:
+        return hit[1]
 
     # Si c'est une variable, on retourne un set contenant son nom
     if isinstance(e, Var):
-        return {e.name}
+        out = frozenset((e.name,))
 
     # Si c'est un nombre ou un booléen, aucune variable n'est utilisée
-    if isinstance(e, (Num, Bool)):
-        return set()
+    elif isinstance(e, (Num, Bool)):
+        out = _NO_VARS
 
     # Si c'est une opération binaire ou relationnelle,
     # on prend l'union des variables dans l'opérande gauche et droite
-    if isinstance(e, (BinOp, RelOp)):
-        return vars_in_expr(e.left) | vars_in_expr(e.right)
+    elif isinstance(e, (BinOp, RelOp)):
+        out = vars_in_expr(e.left) | vars_in_expr(e.right)
 
     # Si l'expression n'est pas reconnue, on lève une erreur
-    raise TypeError(e)
+    else:
+        raise TypeError(e)
+
+    _VARS_MEMO[id(e)] = (e, out)
+    return out
 
 
 # -----------------------------------------------------------------------------
 # Interprocedural effect analysis (R/W footprints with line sites)
 # -----------------------------------------------------------------------------
 
-@dataclass
+@dataclass(init=False)
 class Effect:
     """
     Représente les effets d'une portion de code :
       - lectures et écritures de variables
       - lignes où chaque variable est lue ou écrite
     """
-    reads: set[str] = field(default_factory=set)
-    writes: set[str] = field(default_factory=set)
-    read_sites: dict[str, set[int]] = field(default_factory=dict)
-    write_sites: dict[str, set[int]] = field(default_factory=dict)
+    __slots__ = ("reads", "writes", "read_sites", "write_sites")
+    reads: set[str]
+    writes: set[str]
+    read_sites: dict[str, set[int]]
+    write_sites: dict[str, set[int]]
+
+    def __init__(
+        self,
+        reads: Optional[set[str]] = None,
+        writes: Optional[set[str]] = None,
+        read_sites: Optional[dict[str, set[int]]] = None,
+        write_sites: Optional[dict[str, set[int]]] = None,
+    ) -> None:
+        """
+        Crée un effet, vide par défaut. Écrit à la main car les valeurs par défaut
+        des champs ne sont pas compatibles avec __slots__ : chaque champ omis reçoit
+        un nouveau conteneur.
+        """
+        self.reads = set() if reads is None else reads
+        self.writes = set() if writes is None else writes
+        self.read_sites = {} if read_sites is None else read_sites
+        self.write_sites = {} if write_sites is None else write_sites
 
     def add_read(self, var: str, line: int) -> None:
         """Enregistre une lecture de variable à la ligne donnée"""
@@ -60,65 +105,68 @@ class Effect:
         self.writes.add(var)
         self.write_sites.setdefault(var, set()).add(line)
 
-    def union(self, other: "Effect") -> "Effect":
+    def extend(self, other: "Effect") -> None:
         """
-        Retourne un nouvel effet correspondant à l'union de self et other
-        (fusion des lectures, écritures et des sites associés)
+        Ajoute en place les effets de other à self (sans copier self).
+        other n'est pas modifié et aucun de ses ensembles n'est partagé.
         """
-        out = Effect()
-        out.reads = set(self.reads) | set(other.reads)
-        out.writes = set(self.writes) | set(other.writes)
+        self.reads |= other.reads
+        self.writes |= other.writes
 
-        out.read_sites = {k: set(v) for k, v in self.read_sites.items()}
         for k, v in other.read_sites.items():
-            out.read_sites.setdefault(k, set()).update(v)
-
-        out.write_sites = {k: set(v) for k, v in self.write_sites.items()}
+            self.read_sites.setdefault(k, set()).update(v)
         for k, v in other.write_sites.items():
-            out.write_sites.setdefault(k, set()).update(v)
+            self.write_sites.setdefault(k, set()).update(v)
 
-        return out
-
-    def equals(self, other: "Effect") -> bool:
-        """Vérifie si deux effets sont identiques"""
+    def size(self) -> int:
+        """
+        Nombre total de variables et de sites enregistrés.
+        Un effet qui ne fait que grandir (extend) change si et seulement si sa taille change.
+        """
         return (
-            self.reads == other.reads
-            and self.writes == other.writes
-            and self.read_sites == other.read_sites
-            and self.write_sites == other.write_sites
+            len(self.reads)
+            + len(self.writes)
+            + sum(map(len, self.read_sites.values()))
+            + sum(map(len, self.write_sites.values()))
         )
 
 
-def substitute_effect(callee: Effect, callee_def: FunctionDef, actual_args: list[Expr]) -> Effect:
+def substitute_effect(callee: Effect | ThreadInfo, callee_def: FunctionDef, actual_args: list[Expr]) -> Effect:
     """
     Substitution conservatrice des paramètres formels par les variables réelles
     lors d'un appel de fonction.
 
-    :param callee: effet de la fonction appelée
+    :param callee: effet de la fonction appelée (ou empreinte d'un thread échappé,
+                   lue sans être modifiée)
     :param callee_def: définition de la fonction appelée
     :param actual_args: expressions passées en arguments
     :return: nouvel effet adapté aux arguments réels
     """
-    mapping: dict[str, set[str]] = {}
+    mapping: dict[str, frozenset[str]] = {}
     for i, p in enumerate(callee_def.params):
         # On mappe chaque paramètre aux variables contenues dans l'argument réel
-        mapping[p] = vars_in_expr(actual_args[i]) if i < len(actual_args) else set()
+        mapping[p] = vars_in_expr(actual_args[i]) if i < len(actual_args) else _NO_VARS
 
     out = Effect()
 
+    # Références locales pour les boucles imbriquées ci-dessous
+    targets_of = mapping.get
+    add_read, add_write = out.add_read, out.add_write
+    read_sites, write_sites = callee.read_sites, callee.write_sites
+
     # Substituer les lectures
     for v in callee.reads:
-        targets = mapping.get(v, {v})
-        for tv in targets:
-            for ln in callee.read_sites.get(v, set()):
-                out.add_read(tv, ln)
+        lines = read_sites.get(v, ())
+        for tv in targets_of(v, (v,)):
+            for ln in lines:
+                add_read(tv, ln)
 
     # Substituer les écritures
     for v in callee.writes:
-        targets = mapping.get(v, {v})
-        for tv in targets:
-            for ln in callee.write_sites.get(v, set()):
-                out.add_write(tv, ln)
+        lines = write_sites.get(v, ())
+        for tv in targets_of(v, (v,)):
+            for ln in lines:
+                add_write(tv, ln)
 
     return out
 
@@ -135,7 +183,7 @@ def compute_effect_seq(seq: Seq, prog: Program, effects: dict[str, Effect], curr
     """
     eff = Effect()
     for s in seq.stmts:
-        eff = eff.union(compute_effect_stmt(s, prog, effects, current_func))
+        eff.extend(compute_effect_stmt(s, prog, effects, current_func))
     return eff
 
 
@@ -164,7 +212,7 @@ def compute_effect_stmt(stmt: Stmt, prog: Program, effects: dict[str, Effect], c
             for v in vars_in_expr(a):
                 eff.add_read(v, stmt.line)
         callee_def = prog.functions[stmt.func]
-        eff = eff.union(substitute_effect(effects[stmt.func], callee_def, stmt.args))
+        eff.extend(substitute_effect(effects[stmt.func], callee_def, stmt.args))
         eff.add_write(stmt.target, stmt.line)
         return eff
 
@@ -174,7 +222,8 @@ def compute_effect_stmt(stmt: Stmt, prog: Program, effects: dict[str, Effect], c
             for v in vars_in_expr(a):
                 eff.add_read(v, stmt.line)
         callee_def = prog.functions[stmt.func]
-        return eff.union(substitute_effect(effects[stmt.func], callee_def, stmt.args))
+        eff.extend(substitute_effect(effects[stmt.func], callee_def, stmt.args))
+        return eff
 
     # Spawn (asynchrone)
     if isinstance(stmt, Spawn):
@@ -186,12 +235,12 @@ def compute_effect_stmt(stmt: Stmt, prog: Program, effects: dict[str, Effect], c
                 for v in vars_in_expr(a):
                     eff.add_read(v, stmt.line)
             callee_def = prog.functions[stmt.target.func]
-            thr = substitute_effect(effects[stmt.target.func], callee_def, stmt.target.args)
-            return eff.union(thr)
+            eff.extend(substitute_effect(effects[stmt.target.func], callee_def, stmt.target.args))
+            return eff
 
         if isinstance(stmt.target, SpawnBlock):
-            thr = compute_effect_seq(stmt.target.body, prog, effects, current_func)
-            return eff.union(thr)
+            eff.extend(compute_effect_seq(stmt.target.body, prog, effects, current_func))
+            return eff
 
         raise TypeError(stmt.target)
 
@@ -208,47 +257,94 @@ def compute_effect_stmt(stmt: Stmt, prog: Program, effects: dict[str, Effect], c
     # Séquence de statements
     if isinstance(stmt, Seq):
         for s in stmt.stmts:
-            eff = eff.union(compute_effect_stmt(s, prog, effects, current_func))
+            eff.extend(compute_effect_stmt(s, prog, effects, current_func))
         return eff
 
     # If
     if isinstance(stmt, If):
         for v in vars_in_expr(stmt.cond):
             eff.add_read(v, stmt.line)
-        return (
-            eff
-            .union(compute_effect_stmt(stmt.then_s, prog, effects, current_func))
-            .union(compute_effect_stmt(stmt.else_s, prog, effects, current_func))
-        )
+        eff.extend(compute_effect_stmt(stmt.then_s, prog, effects, current_func))
+        eff.extend(compute_effect_stmt(stmt.else_s, prog, effects, current_func))
+        return eff
 
     # While
     if isinstance(stmt, While):
         for v in vars_in_expr(stmt.cond):
             eff.add_read(v, stmt.line)
-        return eff.union(compute_effect_stmt(stmt.body, prog, effects, current_func))
+        eff.extend(compute_effect_stmt(stmt.body, prog, effects, current_func))
+        return eff
 
     raise TypeError(stmt)
 
 
+def collect_callees(stmt: Stmt, out: set[str]) -> set[str]:
+    """
+    Ajoute à out les noms des fonctions appelées ou spawnées dans un statement
+    (y compris dans les blocs imbriqués).
+
+    :param stmt: statement à parcourir
+    :param out: ensemble accumulant les noms de fonctions
+    :return: out
+    """
+    if isinstance(stmt, (AssignCall, CallStmt)):
+        out.add(stmt.func)
+    elif isinstance(stmt, Spawn):
+        if isinstance(stmt.target, SpawnCall):
+            out.add(stmt.target.func)
+        else:
+            collect_callees(stmt.target.body, out)
+    elif isinstance(stmt, Seq):
+        for s in stmt.stmts:
+            collect_callees(s, out)
+    elif isinstance(stmt, If):
+        collect_callees(stmt.then_s, out)
+        collect_callees(stmt.else_s, out)
+    elif isinstance(stmt, While):
+        collect_callees(stmt.body, out)
+    return out
+
+
 def compute_function_effects(prog: Program) -> dict[str, Effect]:
     """
     Calcule les effets de toutes les fonctions du programme
     en utilisant un fixpoint monotone pour propager les effets inter-fonctions.
 
+    Le fixpoint est calculé par liste de travail : une fonction n'est recalculée
+    que si l'effet d'une fonction qu'elle appelle (ou spawn) a changé.
+    Il n'y a plus de limite d'itérations : l'ancienne limite de 50 tours arrêtait
+    la propagation sur les chaînes d'appels plus profondes et des races n'étaient
+    pas signalées (voir data/Generated examples/14_deep_call_chain.small).
+
+    Le mémo de vars_in_expr n'est pas vidé ici : l'analyse des statements le réutilise,
+    c'est analyze_program qui le vide à la fin.
+
     :param prog: programme complet
     :return: dictionnaire mapping nom de fonction -> effet
     """
     effs: dict[str, Effect] = {name: Effect() for name in prog.functions}
 
-    # On itère jusqu'à ce que les effets convergent ou qu'on atteigne 50 itérations
-    for _ in range(50):
-        changed = False
-        for fname, fdef in prog.functions.items():
-            new_eff = compute_effect_seq(fdef.body, prog, effs, fdef)
-            if not new_eff.equals(effs[fname]):
-                effs[fname] = effs[fname].union(new_eff)
-                changed = True
-        if not changed:
-            break
+    # Graphe d'appel inverse : fonction -> fonctions qui l'appellent
+    callers: dict[str, set[str]] = {}
+    for fname, fdef in prog.functions.items():
+        for callee in collect_callees(fdef.body, set()):
+            callers.setdefault(callee, set()).add(fname)
+
+    worklist = deque(prog.functions)
+    queued = set(worklist)
+    while worklist:
+        fname = worklist.popleft()
+        queued.discard(fname)
+        fdef = prog.functions[fname]
+
+        # Les effets ne font que grandir : l'effet a changé si et seulement si sa taille a changé
+        eff = effs[fname]
+        before = eff.size()
+        eff.extend(compute_effect_seq(fdef.body, prog, effs, fdef))
+        if eff.size() != before:
+            for caller in callers.get(fname, ()):
+                if caller not in queued:
+                    queued.add(caller)
+                    worklist.append(caller)
 
     return effs
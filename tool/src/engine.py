@@ -19,20 +19,33 @@ sont gérés dans des modules dédiés.
 """
 
 from __future__ import annotations
-from typing import Dict, List, Set
+from dataclasses import dataclass
+from itertools import chain
+from typing import Any, Callable, Dict, FrozenSet, List, Optional, Set, Tuple, Union
 
 from src.abstract_syntax_tree import *
-from src.effects import Effect, compute_effect_seq, compute_function_effects, substitute_effect, vars_in_expr
+from src.effects import Effect, clear_vars_memo, compute_effect_seq, compute_function_effects, substitute_effect, vars_in_expr
 from src.constraints import enforce_no_spawn_await_in_if_while, list_spawns_awaits
 from src.concurrency import ConcurState, ThreadInfo, join_states, threadinfo_from_effect
 from src.conflicts import RaceWarning, mode_for, check_access, check_thread_thread
 
 
+# Ensemble vide partagé pour les handles sans thread associé
+# (les valeurs de handle_env ne sont jamais modifiées en place)
+_EMPTY_TIDS: FrozenSet[str] = frozenset()
+
+
 # -----------------------------------------------------------------------------
 # Gestion conservatrice des threads "échappés"
 # -----------------------------------------------------------------------------
 
-def compute_escaping_threads(prog: Program, effects: Dict[str, Effect]) -> Dict[str, List[ThreadInfo]]:
+# Spawns et awaits d'une fonction, dans l'ordre du programme
+ConcSites = Tuple[List[Spawn], List[Await]]
+
+
+def compute_escaping_threads(
+    prog: Program, effects: Dict[str, Effect], conc_sites: Optional[Dict[str, ConcSites]] = None
+) -> Dict[str, List[ThreadInfo]]:
     """
     Calcul, pour chaque fonction, de l'ensemble des threads pouvant survivre après le point d'appel.
 
@@ -50,6 +63,10 @@ def compute_escaping_threads(prog: Program, effects: Dict[str, Effect]) -> Dict[
     effects : Dict[str, Effect]
         Effets interprocéduraux pour chaque fonction, utilisés pour approximer
         l'empreinte d'un appel spawné.
+    conc_sites : Optional[Dict[str, ConcSites]]
+        Pour chaque fonction, spawns et awaits déjà collectés par
+        enforce_no_spawn_await_in_if_while, ce qui évite de reparcourir les corps.
+        Si None, ils sont recalculés avec list_spawns_awaits.
 
     Retours
     -------
@@ -59,7 +76,14 @@ def compute_escaping_threads(prog: Program, effects: Dict[str, Effect]) -> Dict[
     """
     esc: Dict[str, List[ThreadInfo]] = {}
     for fname, fdef in prog.functions.items():
-        spawns, awaits = list_spawns_awaits(fdef.body, [], [])
+        if conc_sites is not None:
+            spawns, awaits = conc_sites[fname]
+        else:
+            spawns, awaits = list_spawns_awaits(fdef.body, [], [])
+        if not spawns:
+            esc[fname] = []
+            continue
+
         awaited = {a.handle for a in awaits}
 
         threads: List[ThreadInfo] = []
@@ -84,237 +108,355 @@ def compute_escaping_threads(prog: Program, effects: Dict[str, Effect]) -> Dict[
 
 
 # -----------------------------------------------------------------------------
-# Analyseur central (statement)
+# Informations pré-calculées par fonction appelée
 # -----------------------------------------------------------------------------
 
-def analyze_stmt(
-    stmt: Stmt,
-    prog: Program,
-    effects: Dict[str, Effect],
-    escapes: Dict[str, List[ThreadInfo]],
-    current_func: FunctionDef,
-    state: ConcurState,
-    warnings: Set[RaceWarning],
-) -> ConcurState:
+@dataclass(frozen=True)
+class CallSiteInfo:
     """
-    Analyse un seul statement, met à jour l'état concurrent et émet des avertissements.
+    Données nécessaires à l'analyse d'un site d'appel (ou de spawn) d'une fonction,
+    regroupées une seule fois au début de analyze_program.
 
-    La fonction effectue un parcours structurel des statements de l'AST. À chaque étape, elle :
-      1) Approxime l'empreinte lecture/écriture de l'opération courante (y compris
-         la substitution interprocédurale pour les appels et les spawns),
-      2) Compare ces accès avec les threads actuellement actifs dans `state`
-         pour détecter d'éventuelles data races (voir conflicts.py),
-      3) Met à jour `state` (par ex. en enregistrant de nouveaux threads actifs pour un spawn,
-         en liant les handles, en supprimant les threads sur await),
-      4) Accumule les avertissements dans l'ensemble `warnings` fourni.
+    :param callee_def: définition de la fonction appelée
+    :param effect: effet interprocédural de la fonction appelée
+    :param escapes: threads échappés de la fonction, à activer au site d'appel
+    """
+    callee_def: FunctionDef
+    effect: Effect
+    escapes: List[ThreadInfo]
 
-    Paramètres
-    ----------
-    stmt : Stmt
-        Statement à analyser.
-    prog : Program
-        Programme en cours d'analyse ; utilisé pour résoudre les définitions de fonctions.
-    effects : Dict[str, Effect]
-        Effets interprocéduraux pré-calculés pour chaque fonction.
-    escapes : Dict[str, List[ThreadInfo]]
-        Threads échappés par fonction à ajouter aux sites d'appel.
-    current_func : FunctionDef
-        Définition de la fonction en cours d'analyse ; utilisée pour les chaînes de contexte
-        et pour calculer les effets de blocs si nécessaire.
-    state : ConcurState
-        État concurrent courant (threads actifs + environnement des handles) avant `stmt`.
-    warnings : Set[RaceWarning]
-        Ensemble global utilisé pour collecter les avertissements uniques pendant l'analyse.
 
-    Retours
-    -------
-    ConcurState
-        L'état mis à jour après l'analyse de `stmt`.
+def build_call_info(
+    prog: Program, effects: Dict[str, Effect], escapes: Dict[str, List[ThreadInfo]]
+) -> Dict[str, CallSiteInfo]:
+    """
+    Construit le CallSiteInfo de chaque fonction du programme.
 
+    :param prog: programme parsé
+    :param effects: effets interprocéduraux par fonction
+    :param escapes: threads échappés par fonction
+    :return: dictionnaire nom de fonction -> CallSiteInfo
     """
+    return {
+        name: CallSiteInfo(callee_def=fdef, effect=effects[name], escapes=escapes.get(name, []))
+        for name, fdef in prog.functions.items()
+    }
+
 
-    def add_all(ws: List[RaceWarning]) -> None:
-        """Ajoute tous les warnings donnés à l'ensemble global."""
-        for w in ws:
-            warnings.add(w)
+# -----------------------------------------------------------------------------
+# Substitution mémoïsée aux sites d'appel
+# -----------------------------------------------------------------------------
+
+# Clé d'un site d'appel : (fonction appelée, indice du thread échappé ou -1 pour
+# l'effet de la fonction elle-même, variables de chaque argument)
+SubstKey = Tuple[str, int, Tuple[FrozenSet[str], ...]]
+
+# Indice utilisé dans SubstKey pour l'effet propre de la fonction appelée
+CALLEE_EFFECT = -1
+
+
+def args_signature(args: List[Expr]) -> Tuple[FrozenSet[str], ...]:
+    """
+    Signature des arguments réels d'un appel pour la substitution.
+
+    substitute_effect ne dépend que des variables apparaissant dans chaque argument :
+    deux sites d'appel ayant la même signature produisent donc le même effet substitué.
+
+    :param args: expressions passées en arguments
+    :return: tuple des ensembles de variables de chaque argument
+    """
+    return tuple(vars_in_expr(a) for a in args)
+
+
+def cached_substitute(
+    cache: Dict[SubstKey, Effect],
+    key: SubstKey,
+    callee: Union[Effect, ThreadInfo],
+    callee_def: FunctionDef,
+    args: List[Expr],
+) -> Effect:
+    """
+    substitute_effect mémoïsé par (fonction, thread échappé, signature des arguments).
+
+    L'effet retourné est partagé entre les sites d'appel et ne doit pas être modifié.
+
+    :param cache: cache propre à une exécution de analyze_program
+    :param key: clé du site d'appel (voir SubstKey)
+    :param callee: effet ou thread échappé à substituer
+    :param callee_def: définition de la fonction appelée
+    :param args: expressions passées en arguments
+    :return: effet substitué
+    """
+    eff = cache.get(key)
+    if eff is None:
+        eff = substitute_effect(callee, callee_def, args)
+        cache[key] = eff
+    return eff
+
+
+# -----------------------------------------------------------------------------
+# Analyseur central (statement)
+# -----------------------------------------------------------------------------
 
-    # Assignements simples
-    if isinstance(stmt, Assign):
-        # Réinitialisation des bindings de handle pour éviter les awaits sur des handles obsolètes
-        if stmt.target in state.handle_env:
-            state.handle_env[stmt.target] = set()
+@dataclass(frozen=True)
+class AnalysisContext:
+    """
+    Données constantes pendant l'analyse du corps d'une fonction, passées
+    en un seul argument à chaque handler de statement.
+
+    :param prog: programme en cours d'analyse ; utilisé pour calculer les effets des blocs spawnés
+    :param effects: effets interprocéduraux pré-calculés pour chaque fonction
+    :param call_info: définition, effet et threads échappés de chaque fonction (voir build_call_info)
+    :param current_func: fonction en cours d'analyse ; utilisée pour les chaînes de contexte
+                         et pour calculer les effets de blocs si nécessaire
+    :param subst_cache: cache des effets substitués aux sites d'appel (voir cached_substitute)
+    """
+    prog: Program
+    effects: Dict[str, Effect]
+    call_info: Dict[str, CallSiteInfo]
+    current_func: FunctionDef
+    subst_cache: Dict[SubstKey, Effect]
 
-        reads = vars_in_expr(stmt.expr)
-        writes = {stmt.target}
 
-        for var in sorted(reads | writes):
-            m = mode_for(var, reads, writes)
-            add_all(check_access(state, var, m, stmt.line, f"{current_func.name}:{m} at line {stmt.line}"))
+def _analyze_assign(stmt: Assign, ctx: AnalysisContext, state: ConcurState, warnings: Set[RaceWarning]) -> ConcurState:
+    """Assignement simple : lecture des variables de l'expression, écriture de la cible."""
+    # Réinitialisation des bindings de handle pour éviter les awaits sur des handles obsolètes
+    if stmt.target in state.handle_env:
+        state.handle_env[stmt.target] = _EMPTY_TIDS
 
+    # Aucun thread actif : aucune course possible, inutile de calculer les accès
+    if not state.active:
         return state
 
-    # Assignments via appel de fonction
-    if isinstance(stmt, AssignCall):
-        # x = f(...): évaluer les arguments (lectures), prendre en compte les effets de la fonction appelée,
-        # puis écrire dans x, et ajouter tous les threads échappés provenant de f
-        if stmt.target in state.handle_env:
-            state.handle_env[stmt.target] = set()
+    reads = vars_in_expr(stmt.expr)
+    writes = {stmt.target}
+
+    for var in reads | writes:
+        m = mode_for(var, reads, writes)
+        warnings.update(check_access(state, var, m, stmt.line, ("{}:{} at line {}", ctx.current_func.name, m, stmt.line)))
 
-        arg_reads: Set[str] = set()
-        for a in stmt.args:
-            arg_reads |= vars_in_expr(a)
+    return state
+
+
+def _analyze_call(
+    stmt: Union[AssignCall, CallStmt], ctx: AnalysisContext, state: ConcurState, warnings: Set[RaceWarning]
+) -> ConcurState:
+    """
+    Appel de fonction, avec ou sans assignation du résultat.
 
+    x = f(...) : évaluer les arguments (lectures), prendre en compte les effets de la fonction appelée,
+    puis écrire dans x (AssignCall uniquement), et ajouter tous les threads échappés provenant de f.
+    """
+    current_func = ctx.current_func
+    is_assign = isinstance(stmt, AssignCall)
+    if is_assign and stmt.target in state.handle_env:
+        state.handle_env[stmt.target] = _EMPTY_TIDS
+
+    args_key = args_signature(stmt.args)
+    ci = ctx.call_info[stmt.func]
+    callee_def = ci.callee_def
+
+    # Les vérifications ne concernent que les régions où d'autres threads sont actifs
+    if state.active:
         # Vérifie les lectures des arguments
-        for var in sorted(arg_reads):
-            add_all(check_access(state, var, "R", stmt.line, f"{current_func.name}:R(arg) at call site line {stmt.line}"))
+        for var in set().union(*args_key):
+            warnings.update(check_access(state, var, "R", stmt.line, ("{}:R(arg) at call site line {}", current_func.name, stmt.line)))
 
-        callee_def = prog.functions[stmt.func]
-        callee_eff = substitute_effect(effects[stmt.func], callee_def, stmt.args)
+        callee_eff = cached_substitute(ctx.subst_cache, (stmt.func, CALLEE_EFFECT, args_key), ci.effect, callee_def, stmt.args)
 
         # Vérifie les lectures/écritures dans le corps appelé
-        for var in sorted(callee_eff.reads | callee_eff.writes):
+        for var in callee_eff.reads | callee_eff.writes:
             m = mode_for(var, callee_eff.reads, callee_eff.writes)
-            lines = (callee_eff.read_sites.get(var, set()) | callee_eff.write_sites.get(var, set())) or {stmt.line}
-            ln = min(lines)
-            add_all(check_access(state, var, m, ln, f"{stmt.func}:{m} during call from {current_func.name} at line {stmt.line}"))
+            ln = min(chain(callee_eff.read_sites.get(var, ()), callee_eff.write_sites.get(var, ())), default=stmt.line)
+            warnings.update(check_access(state, var, m, ln, ("{}:{} during call from {} at line {}", stmt.func, m, current_func.name, stmt.line)))
 
         # Vérifie l'écriture du résultat
-        add_all(check_access(state, stmt.target, "W", stmt.line, f"{current_func.name}:W(ret) at line {stmt.line}"))
-
-        # Propagation des threads échappés
-        for t in escapes.get(stmt.func, []):
-            base = Effect(
-                reads=set(t.reads),
-                writes=set(t.writes),
-                read_sites={k: set(v) for k, v in t.read_sites.items()},
-                write_sites={k: set(v) for k, v in t.write_sites.items()},
-            )
-            sub = substitute_effect(base, callee_def, stmt.args)
-            tid = f"escaped:{t.thread_id}@call{stmt.line}"
-            state.active[tid] = threadinfo_from_effect(sub, tid, t.desc, t.spawn_line)
+        if is_assign:
+            warnings.update(check_access(state, stmt.target, "W", stmt.line, ("{}:W(ret) at line {}", current_func.name, stmt.line)))
 
-        return state
+    # Propagation des threads échappés
+    if ci.escapes:
+        for i, t in enumerate(ci.escapes):
+            sub = cached_substitute(ctx.subst_cache, (stmt.func, i, args_key), t, callee_def, stmt.args)
+            tid = f"escaped:{t.thread_id}@call{stmt.line}"
+            state.add_thread(threadinfo_from_effect(sub, tid, t.desc, t.spawn_line))
+
+    return state
+
+
+def _analyze_spawn(stmt: Spawn, ctx: AnalysisContext, state: ConcurState, warnings: Set[RaceWarning]) -> ConcurState:
+    """Spawn de thread : vérifie le parent puis les chevauchements avec les threads actifs."""
+    current_func = ctx.current_func
+
+    # La création d'un handle (si elle existe) est considérée comme une écriture dans la variable handle
+    if stmt.handle is not None:
+        # Réinitialise toute liaison précédente pour ce handle afin d'éviter des await obsolètes
+        if stmt.handle in state.handle_env:
+            state.handle_env[stmt.handle] = _EMPTY_TIDS
+        if state.active:
+            warnings.update(check_access(state, stmt.handle, "W", stmt.line, ("{}:W(handle) at spawn line {}", current_func.name, stmt.line)))
+
+    # Le parent (thread spawnant) évalue les arguments avant que le nouveau thread ne démarre
+    if isinstance(stmt.target, SpawnCall):
+        args_key = args_signature(stmt.target.args)
+
+        # Toute lecture pour l'évaluation des arguments peut entrer en conflit avec des threads existants
+        if state.active:
+            for var in set().union(*args_key):
+                warnings.update(check_access(state, var, "R", stmt.line, ("{}:R(arg) at spawn line {}", current_func.name, stmt.line)))
+
+        # L'empreinte du nouveau thread correspond à celle de la fonction appelée, avec les arguments réels substitués
+        ci = ctx.call_info[stmt.target.func]
+        thr = cached_substitute(
+            ctx.subst_cache, (stmt.target.func, CALLEE_EFFECT, args_key), ci.effect, ci.callee_def, stmt.target.args
+        )
+        desc = f"spawn {stmt.target.func}(...) in {current_func.name}"
+        tid_base = stmt.handle if stmt.handle else stmt.target.func
+
+    else:
+        # Spawn de bloc : calculer l'empreinte du bloc comme effet du nouveau thread
+        thr = compute_effect_seq(stmt.target.body, ctx.prog, ctx.effects, current_func)
+        desc = f"spawn {{block}} in {current_func.name}"
+        tid_base = stmt.handle if stmt.handle else "_anon"
+
+    # Créer un identifiant de thread unique et vérifier les chevauchements par paires avec les threads existants
+    tid = f"{current_func.name}:{tid_base}@{stmt.line}"
+    newt = threadinfo_from_effect(thr, tid, desc, stmt.line)
+
+    # Seuls les threads partageant une variable (avec au moins une écriture) peuvent entrer en conflit
+    if state.active:
+        for old_tid in state.threads_overlapping(newt):
+            old = state.active.get(old_tid)
+            if old is not None:
+                warnings.update(check_thread_thread(newt, old, stmt.line))
+
+    # Activer le nouveau thread
+    state.add_thread(newt)
+
+    # Lier le handle à cet identifiant de thread pour qu'un await ultérieur puisse le rejoindre
+    if stmt.handle is not None:
+        state.handle_env[stmt.handle] = state.handle_env.get(stmt.handle, _EMPTY_TIDS) | {tid}
+    else:
+        # Autoriser await <nomFonction> pour la forme "spawn f(...);" (sucre syntaxique)
+        if isinstance(stmt.target, SpawnCall):
+            state.handle_env[stmt.target.func] = state.handle_env.get(stmt.target.func, _EMPTY_TIDS) | {tid}
 
-    # Appel de fonction sans assignation
-    if isinstance(stmt, CallStmt):
-        arg_reads: Set[str] = set()
-        for a in stmt.args:
-            arg_reads |= vars_in_expr(a)
+    return state
 
-        for var in sorted(arg_reads):
-            add_all(check_access(state, var, "R", stmt.line, f"{current_func.name}:R(arg) at call site line {stmt.line}"))
 
-        callee_def = prog.functions[stmt.func]
-        callee_eff = substitute_effect(effects[stmt.func], callee_def, stmt.args)
+def _analyze_await(stmt: Await, ctx: AnalysisContext, state: ConcurState, warnings: Set[RaceWarning]) -> ConcurState:
+    """Await d'un handle : les threads associés ne sont plus actifs."""
+    tids = state.handle_env.pop(stmt.handle, _EMPTY_TIDS)
+    for tid in tids:
+        state.remove_thread(tid)
+    state.handle_env[stmt.handle] = _EMPTY_TIDS
+    return state
 
-        for var in sorted(callee_eff.reads | callee_eff.writes):
-            m = mode_for(var, callee_eff.reads, callee_eff.writes)
-            lines = (callee_eff.read_sites.get(var, set()) | callee_eff.write_sites.get(var, set())) or {stmt.line}
-            ln = min(lines)
-            add_all(check_access(state, var, m, ln, f"{stmt.func}:{m} during call from {current_func.name} at line {stmt.line}"))
-
-        for t in escapes.get(stmt.func, []):
-            base = Effect(
-                reads=set(t.reads),
-                writes=set(t.writes),
-                read_sites={k: set(v) for k, v in t.read_sites.items()},
-                write_sites={k: set(v) for k, v in t.write_sites.items()},
-            )
-            sub = substitute_effect(base, callee_def, stmt.args)
-            tid = f"escaped:{t.thread_id}@call{stmt.line}"
-            state.active[tid] = threadinfo_from_effect(sub, tid, t.desc, t.spawn_line)
 
+def _analyze_return(stmt: Return, ctx: AnalysisContext, state: ConcurState, warnings: Set[RaceWarning]) -> ConcurState:
+    """Return : lecture des variables de l'expression retournée."""
+    if not state.active:
         return state
+    for var in vars_in_expr(stmt.expr):
+        warnings.update(check_access(state, var, "R", stmt.line, ("{}:R(return) at line {}", ctx.current_func.name, stmt.line)))
+    return state
 
-    # Spawn de thread
-    if isinstance(stmt, Spawn):
-        # La création d'un handle (si elle existe) est considérée comme une écriture dans la variable handle
-        if stmt.handle is not None:
-            # Réinitialise toute liaison précédente pour ce handle afin d'éviter des await obsolètes
-            if stmt.handle in state.handle_env:
-                state.handle_env[stmt.handle] = set()
-            add_all(check_access(state, stmt.handle, "W", stmt.line, f"{current_func.name}:W(handle) at spawn line {stmt.line}"))
-
-        # Le parent (thread spawnant) évalue les arguments avant que le nouveau thread ne démarre
-        if isinstance(stmt.target, SpawnCall):
-            arg_reads: Set[str] = set()
-            for a in stmt.target.args:
-                arg_reads |= vars_in_expr(a)
-
-            # Toute lecture pour l'évaluation des arguments peut entrer en conflit avec des threads existants
-            for var in sorted(arg_reads):
-                add_all(check_access(state, var, "R", stmt.line, f"{current_func.name}:R(arg) at spawn line {stmt.line}"))
 
-            # L'empreinte du nouveau thread correspond à celle de la fonction appelée, avec les arguments réels substitués
-            callee_def = prog.functions[stmt.target.func]
-            thr = substitute_effect(effects[stmt.target.func], callee_def, stmt.target.args)
-            desc = f"spawn {stmt.target.func}(...) in {current_func.name}"
-            tid_base = stmt.handle if stmt.handle else stmt.target.func
+def _analyze_if(stmt: If, ctx: AnalysisContext, state: ConcurState, warnings: Set[RaceWarning]) -> ConcurState:
+    """If : chaque branche est analysée sur une copie de l'état, puis les deux sont fusionnées."""
+    if state.active:
+        for var in vars_in_expr(stmt.cond):
+            warnings.update(check_access(state, var, "R", stmt.line, ("{}:R(if-cond) at line {}", ctx.current_func.name, stmt.line)))
+    st_then = analyze_stmt(stmt.then_s, ctx, state.copy(), warnings)
+    st_else = analyze_stmt(stmt.else_s, ctx, state.copy(), warnings)
+    return join_states(st_then, st_else)
 
-        else:
-            # Spawn de bloc : calculer l'empreinte du bloc comme effet du nouveau thread
-            thr = compute_effect_seq(stmt.target.body, prog, effects, current_func)
-            desc = f"spawn {{block}} in {current_func.name}"
-            tid_base = stmt.handle if stmt.handle else "_anon"
 
-        # Créer un identifiant de thread unique et vérifier les chevauchements par paires avec les threads existants
-        tid = f"{current_func.name}:{tid_base}@{stmt.line}"
-        newt = threadinfo_from_effect(thr, tid, desc, stmt.line)
+def _analyze_while(stmt: While, ctx: AnalysisContext, state: ConcurState, warnings: Set[RaceWarning]) -> ConcurState:
+    """While : le corps est analysé sur une copie de l'état, fusionnée avec l'état d'entrée."""
+    if state.active:
+        for var in vars_in_expr(stmt.cond):
+            warnings.update(check_access(state, var, "R", stmt.line, ("{}:R(while-cond) at line {}", ctx.current_func.name, stmt.line)))
+    st_body = analyze_stmt(stmt.body, ctx, state.copy(), warnings)
+    return join_states(state, st_body)
 
-        for old in list(state.active.values()):
-            add_all(check_thread_thread(newt, old, stmt.line))
 
-        # Activer le nouveau thread
-        state.active[tid] = newt
+def _analyze_seq(stmt: Seq, ctx: AnalysisContext, state: ConcurState, warnings: Set[RaceWarning]) -> ConcurState:
+    """
+    Séquence : les statements sont analysés dans l'ordre en propageant l'état.
 
-        # Lier le handle à cet identifiant de thread pour qu'un await ultérieur puisse le rejoindre
-        if stmt.handle is not None:
-            state.handle_env.setdefault(stmt.handle, set()).add(tid)
-        else:
-            # Autoriser await <nomFonction> pour la forme "spawn f(...);" (sucre syntaxique)
-            if isinstance(stmt.target, SpawnCall):
-                state.handle_env.setdefault(stmt.target.func, set()).add(tid)
+    Les séquences imbriquées sont aplaties au fil du parcours avec une pile,
+    sans appel récursif par niveau d'imbrication.
+    """
+    stack: List[Stmt] = list(reversed(stmt.stmts))
+    while stack:
+        s = stack.pop()
+        if type(s) is Seq:
+            stack.extend(reversed(s.stmts))
+            continue
+        handler = _HANDLERS.get(type(s))
+        if handler is None:
+            raise TypeError(s)
+        state = handler(s, ctx, state, warnings)
+    return state
+
+
+# Handler de chaque type de statement
+_HANDLERS: Dict[type, Callable[[Any, AnalysisContext, ConcurState, Set[RaceWarning]], ConcurState]] = {
+    Seq: _analyze_seq,
+    Assign: _analyze_assign,
+    AssignCall: _analyze_call,
+    CallStmt: _analyze_call,
+    Spawn: _analyze_spawn,
+    Await: _analyze_await,
+    Return: _analyze_return,
+    If: _analyze_if,
+    While: _analyze_while,
+}
 
-        return state
 
-    # Await d'un handle
-    if isinstance(stmt, Await):
-        tids = state.handle_env.get(stmt.handle, set())
-        tids = state.handle_env.get(stmt.handle, set())
-        for tid in list(tids):
-            state.active.pop(tid, None)
-        state.handle_env[stmt.handle] = set()
-        state.handle_env[stmt.handle] = set()
-        return state
+def analyze_stmt(
+    stmt: Stmt,
+    ctx: AnalysisContext,
+    state: ConcurState,
+    warnings: Set[RaceWarning],
+) -> ConcurState:
+    """
+    Analyse un seul statement, met à jour l'état concurrent et émet des avertissements.
 
-    # Return
-    if isinstance(stmt, Return):
-        reads = vars_in_expr(stmt.expr)
-        for var in sorted(reads):
-            add_all(check_access(state, var, "R", stmt.line, f"{current_func.name}:R(return) at line {stmt.line}"))
-        return state
+    La fonction effectue un parcours structurel des statements de l'AST. À chaque étape, elle :
+      1) Approxime l'empreinte lecture/écriture de l'opération courante (y compris
+         la substitution interprocédurale pour les appels et les spawns),
+      2) Compare ces accès avec les threads actuellement actifs dans `state`
+         pour détecter d'éventuelles data races (voir conflicts.py),
+      3) Met à jour `state` (par ex. en enregistrant de nouveaux threads actifs pour un spawn,
+         en liant les handles, en supprimant les threads sur await),
+      4) Accumule les avertissements dans l'ensemble `warnings` fourni.
 
-    # Séquence de statements
-    if isinstance(stmt, Seq):
-        for s in stmt.stmts:
-            state = analyze_stmt(s, prog, effects, escapes, current_func, state, warnings)
-        return state
+    Chaque statement est délégué au handler de son type (voir _HANDLERS) ;
+    un type inconnu lève une TypeError.
 
-    # If / While
-    if isinstance(stmt, If):
-        for var in sorted(vars_in_expr(stmt.cond)):
-            add_all(check_access(state, var, "R", stmt.line, f"{current_func.name}:R(if-cond) at line {stmt.line}"))
-        st_then = analyze_stmt(stmt.then_s, prog, effects, escapes, current_func, state.copy(), warnings)
-        st_else = analyze_stmt(stmt.else_s, prog, effects, escapes, current_func, state.copy(), warnings)
-        return join_states(st_then, st_else)
+    Paramètres
+    ----------
+    stmt : Stmt
+        Statement à analyser.
+    ctx : AnalysisContext
+        Programme, effets, informations d'appel et fonction courante.
+    state : ConcurState
+        État concurrent courant (threads actifs + environnement des handles) avant `stmt`.
+    warnings : Set[RaceWarning]
+        Ensemble global utilisé pour collecter les avertissements uniques pendant l'analyse.
 
-    if isinstance(stmt, While):
-        for var in sorted(vars_in_expr(stmt.cond)):
-            add_all(check_access(state, var, "R", stmt.line, f"{current_func.name}:R(while-cond) at line {stmt.line}"))
-        st_body = analyze_stmt(stmt.body, prog, effects, escapes, current_func, state.copy(), warnings)
-        return join_states(state, st_body)
+    Retours
+    -------
+    ConcurState
+        L'état mis à jour après l'analyse de `stmt`.
 
-    raise TypeError(stmt)
+    """
+    handler = _HANDLERS.get(type(stmt))
+    if handler is None:
+        raise TypeError(stmt)
+    return handler(stmt, ctx, state, warnings)
 
 
 # -----------------------------------------------------------------------------
@@ -341,18 +483,35 @@ def analyze_program(prog: Program) -> List[RaceWarning]:
     -------
     List[RaceWarning]
         Liste triée des avertissements de data races pour un affichage stable.
+        Seul ce tri final fixe l'ordre d'affichage : analyze_stmt parcourt
+        les ensembles de variables sans les trier. La clé couvre tous les champs
+        de RaceWarning, l'ordre ne dépend donc pas de PYTHONHASHSEED.
     """
-    # enforce project constraint
-    for f in prog.functions.values():
-        enforce_no_spawn_await_in_if_while(f.body, inside_control=False)
-
-    # calcul des effets pour chaque fonction
-    effects = compute_function_effects(prog)
-    # identification des threads "échappés"
-    escapes = compute_escaping_threads(prog, effects)
-
-    warnings: Set[RaceWarning] = set()
-    for f in prog.functions.values():
-        analyze_stmt(f.body, prog, effects, escapes, f, ConcurState(), warnings)
-
-    return sorted(warnings, key=lambda w: (w.line_a, w.var, w.kind))
+    # enforce project constraint (et collecte les spawn/await de chaque fonction)
+    conc_sites: Dict[str, ConcSites] = {}
+    for name, f in prog.functions.items():
+        spawns: List[Spawn] = []
+        awaits: List[Await] = []
+        enforce_no_spawn_await_in_if_while(f.body, inside_control=False, spawns=spawns, awaits=awaits)
+        conc_sites[name] = (spawns, awaits)
+
+    try:
+        # calcul des effets pour chaque fonction
+        effects = compute_function_effects(prog)
+        # identification des threads "échappés"
+        escapes = compute_escaping_threads(prog, effects, conc_sites)
+
+        # regroupement des informations par fonction appelée
+        call_info = build_call_info(prog, effects, escapes)
+
+        warnings: Set[RaceWarning] = set()
+        subst_cache: Dict[SubstKey, Effect] = {}
+        for f in prog.functions.values():
+            ctx = AnalysisContext(prog=prog, effects=effects, call_info=call_info, current_func=f, subst_cache=subst_cache)
+            analyze_stmt(f.body, ctx, ConcurState(), warnings)
+    finally:
+        # Le mémo de vars_in_expr est partagé par le calcul des effets et l'analyse des
+        # statements ; il garde l'AST vivant, on le vide donc une fois l'analyse terminée
+        clear_vars_memo()
+
+    return sorted(warnings, key=lambda w: (w.line_a, w.var, w.kind, w.ctx_a, w.lines_b, w.ctx_b))
@@ -11,7 +11,7 @@ def format_warning(w: RaceWarning) -> str:
     :return: chaîne de caractères lisible décrivant la race
     """
 
-    b_lines = ", ".join(str(x) for x in w.lines_b) if w.lines_b else "?"
+    b_lines = ", ".join(map(str, w.lines_b)) if w.lines_b else "?"
 
     # Construction du message multi-lignes
     return (
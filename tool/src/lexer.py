@@ -2,6 +2,7 @@ from __future__ import annotations
 from dataclasses import dataclass
 from typing import List
 import re
+import sys
 
 
 # Ensemble des mots-clés du langage que le lexer doit reconnaître
@@ -13,9 +14,7 @@ KEYWORDS = {
 
 # Expression régulière principale pour identifier les différents types de tokens
 _TOKEN_RE = re.compile(r"""
-    (?P<WS>[ \t]+)|                     # Espaces ou tabulations (ignorés)
-    (?P<NL>\n)|                         # Nouvelle ligne
-    (?P<COMMENT>//[^\n]*)|              # Commentaires commençant par //
+    (?P<SKIP>(?:[ \t\n]+|//[^\n]*)+)|   # Espaces, nouvelles lignes et commentaires (ignorés en un seul bloc)
     (?P<NUM>\d+)|                       # Nombres (séquence de chiffres)
     (?P<ID>[A-Za-z_][A-Za-z0-9_]*)|     # Identificateurs (lettre ou _ suivie de lettres/chiffres/_)
     (?P<OP>==|!=|>=|<=|[+\-*/<>])|      # Opérateurs (comparaison ou arithmétique)
@@ -50,29 +49,25 @@ def lex(src: str) -> List[Token]:
         kind = m.lastgroup
         text = m.group(kind)
 
-        # Ignorer les espaces et commentaires
-        if kind in ("WS", "COMMENT"):
+        # Ignorer les espaces, nouvelles lignes et commentaires consécutifs
+        if kind == "SKIP":
             pos = m.end()
-            col += len(text)
-            continue
-
-        # Gestion des nouvelles lignes
-        if kind == "NL":
-            pos = m.end()
-            line += 1
-            col = 1
+            last_nl = text.rfind("\n")
+            if last_nl < 0:
+                col += len(text)
+            else:
+                line += text.count("\n")
+                col = len(text) - last_nl
             continue
 
         # Identifier les tokens
         if kind == "ID":
+            # Les identifiants sont internés : les noms de variables, handles et fonctions
+            # partagent ainsi un seul objet str dans tout l'AST et les ensembles de l'analyse
             k = "KW" if text in KEYWORDS else "ID"
-            toks.append(Token(k, text, line, col))
-        elif kind == "NUM":
-            toks.append(Token("NUM", text, line, col))
-        elif kind == "OP":
-            toks.append(Token("OP", text, line, col))
-        elif kind == "SYM":
-            toks.append(Token("SYM", text, line, col))
+            toks.append(Token(k, sys.intern(text), line, col))
+        elif kind in ("NUM", "OP", "SYM"):
+            toks.append(Token(kind, text, line, col))
         else:
             raise LexerError("Internal lexer error")
 